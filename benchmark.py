@@ -0,0 +1,276 @@
+"""Offline benchmark: replay recorded LinkedIn result pages through the bot.
+
+Pages in bench/pages/ are served in order by a local HTTP server standing in
+for the seeMoreJobPostings endpoint, so nothing touches the network or Discord.
+
+    python benchmark.py                     # print a report
+    python benchmark.py --json out.json     # also write the numbers
+    python benchmark.py --baseline out.json # exit 1 on a regression
+    python benchmark.py --capture           # record fresh pages from LinkedIn
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from aiohttp import web
+
+import bot
+from jobs import job_from_card
+from matcher import KeywordIndex
+from recency import is_recent, posted_at
+from store import SeenStore
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench", "pages")
+SEARCH_PATH = "/jobs-guest/jobs/api/seeMoreJobPostings/search"
+
+# Metrics where a larger value is a regression, checked against --baseline
+TIMED_METRICS = ("parse_ms_per_page", "recency_us_per_card", "filter_us_per_job", "e2e_seconds")
+
+
+def load_corpus(corpus_dir=CORPUS_DIR):
+    pages = []
+    for path in sorted(glob.glob(os.path.join(corpus_dir, "*.html"))):
+        with open(path, "r", encoding="utf-8") as f:
+            pages.append(f.read())
+    return pages
+
+
+class ReplayServer:
+    """Serve corpus pages by `start` offset on a background event loop."""
+
+    def __init__(self, pages, page_size=10):
+        self.pages = pages
+        self.page_size = page_size
+        self.requests = 0
+        self.connections = set()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+
+    async def _handle(self, request):
+        self.requests += 1
+        self.connections.add(request.transport.get_extra_info("peername"))
+        page = int(request.query.get("start", 0)) // self.page_size
+        body = self.pages[page] if page < len(self.pages) else ""
+        return web.Response(text=body, content_type="text/html")
+
+    async def _start(self):
+        app = web.Application()
+        app.router.add_get(SEARCH_PATH, self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        return self._runner.addresses[0][1]
+
+    def __enter__(self):
+        self._thread.start()
+        port = asyncio.run_coroutine_threadsafe(self._start(), self._loop).result()
+        self.url = f"http://127.0.0.1:{port}{SEARCH_PATH}"
+        return self
+
+    def __exit__(self, *exc):
+        asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+
+class NullChannel:
+    """Stand-in Discord channel that only counts what would be sent."""
+
+    def __init__(self):
+        self.messages = 0
+        self.embeds = 0
+
+    async def send(self, embed=None, embeds=None):
+        self.messages += 1
+        self.embeds += len(embeds) if embeds else 1
+
+
+def bench_parse(pages, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        cards = [card for page in pages for card in bot.parse_jobs(page)]
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    for page in pages:
+        bot.parse_jobs(page)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    parsed_pages = len(pages) * repeat
+    return cards, {
+        "pages_per_second": parsed_pages / elapsed,
+        "jobs_per_second": len(cards) * repeat / elapsed,
+        "parse_ms_per_page": elapsed / parsed_pages * 1000,
+        "parse_peak_kib": peak / 1024,
+    }
+
+
+def corpus_now(cards):
+    """Return the reference time the corpus was recorded at, from its newest date."""
+    stamps = [posted_at(None, card["datetime"]) for card in cards]
+    return max((stamp for stamp in stamps if stamp), default=None)
+
+
+def bench_recency(cards, now, repeat):
+    posted = [(card["time_posted"], card["datetime"]) for card in cards]
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for text, stamp in posted:
+            is_recent(text, stamp, now)
+    elapsed = time.perf_counter() - start
+    return {"recency_us_per_card": elapsed / (len(posted) * repeat) * 1e6}
+
+
+def bench_filter(cards, channel_configs, now, repeat):
+    jobs = [job_from_card(card, now=now) for card in cards if card["title"] and card["url"]]
+    index = KeywordIndex(channel_configs)
+    mask = index.mask_for(channel_configs)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        bot.route_jobs(jobs, index, mask)
+    elapsed = time.perf_counter() - start
+    return {"filter_us_per_job": elapsed / (len(jobs) * repeat) * 1e6}
+
+
+def bench_end_to_end(pages, config_path, now):
+    with ReplayServer(pages) as server, tempfile.TemporaryDirectory() as tmp:
+        start = time.perf_counter()
+        channel_configs = bot.load_config(config_path)
+        channels = {cfg["channel_id"]: NullChannel() for cfg in channel_configs}
+        seen = SeenStore(os.path.join(tmp, "seen.sqlite3"))
+        try:
+            asyncio.run(
+                bot.scrape_and_post(
+                    channel_configs,
+                    channels,
+                    seen,
+                    url=server.url,
+                    now=now,
+                    host_rate=None,
+                    page_delay=(0, 0),
+                )
+            )
+        finally:
+            seen.close()
+        elapsed = time.perf_counter() - start
+
+    return {
+        "e2e_seconds": elapsed,
+        "e2e_requests": server.requests,
+        "e2e_connections": len(server.connections),
+        "e2e_messages": sum(channel.messages for channel in channels.values()),
+        "e2e_embeds": sum(channel.embeds for channel in channels.values()),
+    }
+
+
+def peak_rss_mib():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and KiB elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def stand_in_channel_ids(config_path):
+    """Give every configured channel a fake id so load_config keeps it."""
+    for number, entry in enumerate(bot.read_config_file(config_path).get("channels", []), 1):
+        if entry.get("channel_env"):
+            os.environ.setdefault(entry["channel_env"], str(number))
+
+
+def run(config_path, corpus_dir, repeat):
+    pages = load_corpus(corpus_dir)
+    if not pages:
+        raise SystemExit(f"No pages found in {corpus_dir}")
+
+    stand_in_channel_ids(config_path)
+    channel_configs = bot.load_config(config_path)
+
+    cards, results = bench_parse(pages, repeat)
+    results["corpus_pages"] = len(pages)
+    results["corpus_jobs"] = len(cards)
+    # Recorded pages carry absolute dates, so replay them at the time they were captured
+    now = corpus_now(cards)
+    results.update(bench_recency(cards, now, repeat))
+    results.update(bench_filter(cards, channel_configs, now, repeat))
+    results.update(bench_end_to_end(pages, config_path, now))
+    results["peak_rss_mib"] = peak_rss_mib()
+    return results
+
+
+async def capture(config_path, corpus_dir, pages):
+    """Record live result pages for the first configured query."""
+    raw = bot.read_config_file(config_path)
+    params = {**raw.get("defaults", {}).get("params", {}), **raw["channels"][0].get("params", {})}
+    params["f_TPR"] = "r86400"
+    os.makedirs(corpus_dir, exist_ok=True)
+
+    async with bot.create_session() as session:
+        fetcher = bot.Fetcher(session)
+        for page in range(pages):
+            status, body = await fetcher.get_text(
+                bot.WEBSITE_URL,
+                headers=bot.get_headers(),
+                params={**{k: str(v) for k, v in params.items()}, "start": str(page * 10)},
+            )
+            if status != 200 or not body.strip():
+                print(f"Stopping capture at page {page}: status {status}")
+                break
+            with open(os.path.join(corpus_dir, f"page-{page:02d}.html"), "w", encoding="utf-8") as f:
+                f.write(body)
+            await fetcher.pause()
+
+
+def check_baseline(results, baseline_path, tolerance):
+    with open(baseline_path, "r") as f:
+        baseline = json.load(f)
+
+    regressions = []
+    for metric in TIMED_METRICS:
+        if metric in baseline and results[metric] > baseline[metric] * (1 + tolerance):
+            regressions.append(f"{metric}: {results[metric]:.3f} > {baseline[metric]:.3f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--config", default=bot.CONFIG_PATH)
+    parser.add_argument("--corpus", default=CORPUS_DIR)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="fail if slower than this results file")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--capture", action="store_true", help="record pages instead of benchmarking")
+    parser.add_argument("--capture-pages", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.capture:
+        asyncio.run(capture(args.config, args.corpus, args.capture_pages))
+        return
+
+    results = run(args.config, args.corpus, args.repeat)
+    for metric, value in results.items():
+        print(f"{metric:>22}: {value:,.3f}" if isinstance(value, float) else f"{metric:>22}: {value}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        regressions = check_baseline(results, args.baseline, args.tolerance)
+        for line in regressions:
+            print(f"Regression: {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
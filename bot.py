@@ -1,27 +1,89 @@
+import argparse
 import asyncio
+import hashlib
 import json
 import os
 import random
 import re
+import sqlite3
+import subprocess
+import sys
+import tempfile
 import time
-from datetime import datetime, timedelta
+import uuid
+from datetime import timedelta
+from html.parser import HTMLParser
 
 import discord
-import requests
-from bs4 import BeautifulSoup
+import aiohttp
 from discord.ext import commands
 from dotenv import load_dotenv
 
+try:
+    import yaml
+except ImportError:
+    # Without PyYAML the config file must stay JSON-compatible
+    yaml = None
+
+from fetcher import FetchError, Fetcher, create_session
+from jobs import JobRegistry, canonicalize, job_from_card, job_from_dict, job_to_dict
+from matcher import KeywordIndex
+from planner import order_queries, record_run, run_deadline, scrape_deadline, search_window, time_left
+from polling import PollScheduler
+from recency import is_recent, now_utc
+from shards import parse_shard, shard_channels, shard_events, shard_name, shard_plan, shard_scope
+from store import SeenStore, StateStore
+
 # Load environment variables
 load_dotenv()
 DISCORD_BOT_TOKEN = os.getenv("DISCORD_BOT_TOKEN")
 
+# "rest" posts one-shot runs over the HTTP API and webhooks; "gateway" logs the bot in fully
+POST_MODE = os.getenv("POST_MODE", "rest")
+
 # Config file path
 CONFIG_PATH = "config.yaml"
+# The parsed config survives cold starts here; warm invocations reuse the build from memory
+CONFIG_CACHE_PATH = os.getenv(
+    "CONFIG_CACHE_PATH",
+    os.path.join(tempfile.gettempdir(), "jobs-on-discord", "config.json"),
+)
+# Bump when the cached layout changes so stale caches are ignored
+CONFIG_CACHE_VERSION = 3
 
 # LinkedIn configuration
 WEBSITE_URL = "https://www.linkedin.com/jobs-guest/jobs/api/seeMoreJobPostings/search"
 
+# Pagination limits: results are newest-first (sortBy=DD), so a run of stale
+# cards means everything after it is stale too
+MAX_PAGES = 20
+STALE_RUN = 10
+
+# Discord message limits, and the burst size above which jobs go out as a compact digest
+MAX_EMBEDS_PER_MESSAGE = 10
+MAX_EMBED_CHARS_PER_MESSAGE = 6000
+MAX_EMBED_DESCRIPTION = 4096
+DIGEST_THRESHOLD = 30
+GLOBAL_POST_RATE = 50  # requests per second across all channels
+
+# A shard run holds its lease this long when there is no deadline to go by
+SHARD_LEASE_TTL = 900
+
+# Bounded pipeline queues: a full queue pauses the stage feeding it
+PAGE_QUEUE_SIZE = 8
+POST_QUEUE_SIZE = 4
+
+# Daemon mode: queries start out polled once per f_TPR window, then share a
+# request budget by how often they find new jobs
+DEFAULT_POLL_INTERVAL = 300
+POLL_JITTER = 0.1
+MAX_POLL_BACKOFF = 3600
+# Requests per hour across all queries; unset, it is what polling each
+# query once per f_TPR window costs
+POLL_REQUEST_BUDGET = os.getenv("POLL_REQUEST_BUDGET")
+MIN_POLL_INTERVAL = float(os.getenv("MIN_POLL_INTERVAL", "60"))
+MAX_POLL_INTERVAL = float(os.getenv("MAX_POLL_INTERVAL", "3600"))
+
 # Rotate user agents
 USER_AGENTS = [
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0.0.0 Safari/537.36",
@@ -37,23 +99,133 @@ def parse_keyword_list(value):
     return []
 
 
-def load_config(config_path=CONFIG_PATH):
-    """Load channel configuration from YAML (or JSON-compatible YAML)."""
+def parse_config_text(content):
+    """Parse YAML (or JSON-compatible YAML) config text."""
+    if yaml is not None:
+        return yaml.safe_load(content) or {}
+    return json.loads(content)
+
+def read_config_file(config_path=CONFIG_PATH):
+    """Parse the YAML (or JSON-compatible YAML) config file without resolving it."""
     with open(config_path, "r") as f:
+        return parse_config_text(f.read())
+
+def config_env_names(raw_config):
+    """Return the environment variables a config resolves, in order."""
+    names = []
+    for entry in raw_config.get("channels", []):
+        if isinstance(entry, dict):
+            names.extend(entry[key] for key in ("channel_env", "webhook_env") if entry.get(key))
+    return names
+
+_compiled_configs = {}
+
+def load_config(config_path=CONFIG_PATH, cache_path=CONFIG_CACHE_PATH):
+    """Return compiled channel configs, rebuilding only when the file or its env vars change.
+
+    The build and its KeywordIndex are kept in memory keyed by the file's
+    mtime and size plus the env values. The parsed file is also written to
+    cache_path as JSON keyed by a hash of its bytes, so a cold start skips
+    YAML parsing; env values are resolved afresh on every build and never
+    written out. Pass cache_path=None to skip the disk cache.
+    """
+    stat = os.stat(config_path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    cached = _compiled_configs.get(config_path)
+    if cached and cached["stamp"] == stamp and cached["env"] == {
+        name: os.getenv(name) for name in cached["env"]
+    }:
+        return cached["channels"]
+
+    with open(config_path, "rb") as f:
         content = f.read()
+    fingerprint = hashlib.sha1(content).hexdigest()
+
+    raw_config = read_config_cache(cache_path, fingerprint)
+    if raw_config is None:
+        raw_config = parse_config_text(content.decode("utf-8"))
+        write_config_cache(
+            cache_path, {"version": CONFIG_CACHE_VERSION, "fingerprint": fingerprint, "raw_config": raw_config}
+        )
+
+    channels = compile_config(raw_config)
+    _compiled_configs[config_path] = {
+        "stamp": stamp,
+        "env": {name: os.getenv(name) for name in config_env_names(raw_config)},
+        "channels": channels,
+        "index": KeywordIndex(channels),
+    }
+    return channels
+
+def keyword_index(channel_configs):
+    """Return the KeywordIndex over channel configs, reusing load_config's when they came from it."""
+    for cached in _compiled_configs.values():
+        if cached["channels"] is channel_configs:
+            return cached["index"]
+    return KeywordIndex(channel_configs)
 
+def private_cache_dir(path):
+    """Create the directory holding path for this user only; return False if it is not private."""
+    directory = os.path.dirname(os.path.abspath(path))
     try:
-        import yaml
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        info = os.lstat(directory)
+    except OSError as e:
+        print(f"Config cache directory unavailable: {e}")
+        return False
+    # A directory another user made or can write to could feed us their cache
+    if os.path.islink(directory) or info.st_mode & 0o077 or (
+        hasattr(os, "getuid") and info.st_uid != os.getuid()
+    ):
+        print(f"Config cache directory is not private, ignoring it: {directory}")
+        return False
+    return True
 
-        raw_config = yaml.safe_load(content) or {}
-    except ImportError:
-        # Fallback for environments without PyYAML. The file must stay JSON-compatible.
-        raw_config = json.loads(content)
+def read_config_cache(cache_path, fingerprint):
+    """Return the parsed config cached for a config file's hash, or None."""
+    if not cache_path or not os.path.exists(cache_path) or not private_cache_dir(cache_path):
+        return None
+    try:
+        with open(cache_path, "r") as f:
+            cached = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring config cache: {e}")
+        return None
+    if (
+        not isinstance(cached, dict)
+        or cached.get("version") != CONFIG_CACHE_VERSION
+        or cached.get("fingerprint") != fingerprint
+        or not isinstance(cached.get("raw_config"), dict)
+    ):
+        return None
+    return cached["raw_config"]
+
+def write_config_cache(cache_path, cached):
+    if not cache_path or not private_cache_dir(cache_path):
+        return
+    partial = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        text = json.dumps(cached)
+        # YAML allows what JSON can't round-trip, such as non-string keys
+        if json.loads(text) != cached:
+            return
+        fd = os.open(partial, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with open(fd, "w") as f:
+            f.write(text)
+        os.replace(partial, cache_path)
+    except (OSError, TypeError, ValueError) as e:
+        print(f"Could not write config cache: {e}")
 
+def compile_config(raw_config):
+    """Validate a parsed config, merge defaults and compile each channel."""
     base_params = raw_config.get("defaults", {}).get("params", {}) or {}
     channels = []
 
     for entry in raw_config.get("channels", []):
+        if not isinstance(entry, dict):
+            print(f"Skipping malformed channel entry: {entry!r}")
+            continue
+
         channel_env = entry.get("channel_env")
         if not channel_env:
             print("Skipping channel without channel_env")
@@ -71,151 +243,867 @@ def load_config(config_path=CONFIG_PATH):
             continue
 
         params = {**base_params, **(entry.get("params") or {})}
+        # Optional list of searches feeding this channel, each layered over params
+        queries = [{**params, **(extra or {})} for extra in entry.get("queries") or []] or [params]
+        include = parse_keyword_list(entry.get("include", ""))
+        exclude = parse_keyword_list(entry.get("exclude", ""))
+        whole_words = bool(entry.get("whole_words"))
 
         channels.append(
             {
                 "channel_env": channel_env,
                 "channel_id": channel_id,
-                "include": parse_keyword_list(entry.get("include", "")),
-                "exclude": parse_keyword_list(entry.get("exclude", "")),
+                "include": include,
+                "exclude": exclude,
+                "whole_words": whole_words,
                 "params": params,
+                "query_key": query_key(params),
+                "queries": queries,
+                "webhook_url": os.getenv(entry["webhook_env"]) if entry.get("webhook_env") else None,
             }
         )
 
     return channels
 
+def query_key(params):
+    """Return a stable key identifying a LinkedIn search, independent of key order."""
+    canonical = json.dumps(
+        {str(key): str(value).strip() for key, value in params.items()},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()[:16]
+
+def plan_queries(channel_configs):
+    """Group channels by query so each distinct search is fetched only once."""
+    plan = {}
+    for cfg in channel_configs:
+        for params in cfg.get("queries") or [cfg["params"]]:
+            query = plan.setdefault(query_key(params), {"params": params, "channels": []})
+            if cfg not in query["channels"]:
+                query["channels"].append(cfg)
+    return plan
+
+def poll_interval(params, default=DEFAULT_POLL_INTERVAL):
+    """Return the polling interval in seconds for a query's f_TPR window (e.g. r300)."""
+    match = re.fullmatch(r"r(\d+)", str(params.get("f_TPR", "")).strip())
+    return int(match.group(1)) if match else default
+
 def get_headers():
     return {
         'User-Agent': random.choice(USER_AGENTS),
         'Accept-Language': 'en-US,en;q=0.9',
     }
 
-def is_recent(time_posted_str):
-    if not time_posted_str:
-        return False
-    now = datetime.now()
+class JobCardParser(HTMLParser):
+    """Stream job cards out of a results page without building a tree.
 
-    match = re.search(r"(\d+)\s*(minute|hour|day|second)", time_posted_str.lower())
-    if not match:
-        return False
+    Each <li> is one card; its first h3, h4, a[href], location span and time
+    elements give the title, company, url, location and posting time (text
+    and datetime attribute).
+    """
 
-    num = int(match.group(1))
-    unit = match.group(2)
-
-    if "second" in unit:
-        delta = timedelta(seconds=num)
-    elif "minute" in unit:
-        delta = timedelta(minutes=num)
-    elif "hour" in unit:
-        delta = timedelta(hours=num)
-    elif "day" in unit:
-        delta = timedelta(days=num)
-    else:
-        return False
+    CAPTURED = {"h3": "title", "h4": "company", "time": "time_posted"}
+    LOCATION_CLASS = "job-search-card__location"
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.cards = []
+        self._card = None
+        self._field = None
+        self._field_tag = None
+        self._text = []
+
+    def _finish_card(self):
+        if self._card is not None:
+            self._card['id'], self._card['canonical_url'] = canonicalize(self._card['url'])
+            self.cards.append(self._card)
+        self._card = None
+        self._field = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "li":
+            self._finish_card()
+            self._card = {
+                'id': None, 'title': None, 'company': None, 'url': None,
+                'location': None, 'time_posted': None, 'datetime': None,
+            }
+        elif self._card is None or self._field is not None:
+            return
+        elif tag in self.CAPTURED and self._card[self.CAPTURED[tag]] is None:
+            self._start_field(tag, self.CAPTURED[tag])
+            if tag == "time":
+                self._card['datetime'] = dict(attrs).get("datetime")
+        elif tag == "a" and self._card['url'] is None:
+            self._card['url'] = dict(attrs).get("href")
+        elif tag == "span" and self._card['location'] is None:
+            if self.LOCATION_CLASS in (dict(attrs).get("class") or "").split():
+                self._start_field(tag, 'location')
+
+    def _start_field(self, tag, field):
+        self._field = field
+        self._field_tag = tag
+        self._text = []
+
+    def handle_endtag(self, tag):
+        if tag == "li":
+            self._finish_card()
+        elif self._field is not None and tag == self._field_tag:
+            self._card[self._field] = "".join(self._text).strip()
+            self._field = None
 
-    return delta <= timedelta(minutes=5)
+    def handle_data(self, data):
+        if self._field is not None:
+            self._text.append(data)
 
-def fetch_jobs(params):
-    """Fetch jobs posted in last 5 minutes"""
-    all_jobs = []
+    def close(self):
+        super().close()
+        self._finish_card()
+
+def parse_jobs(html):
+    """Return the job cards found on one page of search results."""
+    parser = JobCardParser()
+    try:
+        parser.feed(html)
+        parser.close()
+    except Exception as e:
+        print(f"Error parsing page: {e}")
+    return parser.cards
+
+async def iter_job_pages(
+    fetcher, params, seen=None, max_pages=MAX_PAGES, stale_run=STALE_RUN, url=WEBSITE_URL, now=None,
+    registry=None, checkpoint=None,
+):
+    """Yield the jobs posted within the query's search window, one results page at a time.
+
+    Cards whose id is already in the seen store are skipped. With a
+    registry, a job another query already found is reused as is. Paging stops at
+    the first page that is entirely seen or stale, after stale_run
+    consecutive stale cards, or after max_pages pages. Raises FetchError
+    once the fetcher's retry policy gives up on a page, or when it comes
+    back with an error status.
+
+    checkpoint is the query's pagination state, updated in place as pages
+    are consumed. spans lists the stretches of results earlier runs
+    handled, newest first, each as [top_id, length]: the run that began at
+    job top_id handled the length results from it down, or everything below
+    it when length is None. Reaching a span's top skips past it, so a run
+    only fetches what no earlier run got to, and a run cut short before it
+    reaches the older spans keeps them for the next. A page that is
+    entirely seen where no span begins lies in the next span, whose first
+    job is gone; it skips at least that span's length, since offsets only
+    grow, and keeps the span until a page with new jobs shows it was left
+    behind. last_success is when the last complete run started.
+
+    The search window starts at the query's f_TPR and then follows
+    last_success, so it spans the time since the last complete run. It
+    sets both the f_TPR sent to LinkedIn and the recency cutoff, and the
+    seen store drops whatever the overlap brings back twice.
+    """
+    key = query_key(params)
+    now = now or now_utc()
+    started = time.time()
+    checkpoint = {} if checkpoint is None else checkpoint
+    spans = checkpoint_spans(checkpoint)
+    window = search_window(poll_interval(params), checkpoint.get("last_success"), started)
+    request_params = {k: str(v) for k, v in params.items()}
+    if "f_TPR" in request_params:
+        request_params["f_TPR"] = f"r{window}"
+    window = timedelta(seconds=window)
     start = 0
+    # Every result above this offset was handled, by this run or an earlier one
+    handled = 0
+    top_id = None
+    # Set while paging through a span whose first job is gone
+    inside = False
+    pages = 0
+    stale_streak = 0
 
-    while True:
+    while pages < max_pages:
+        status, body = await fetcher.get_text(
+            url,
+            headers=get_headers(),
+            params={**request_params, "start": str(start)},
+            key=key,
+        )
+
+        if status != 200:
+            raise FetchError(f"Status {status} for {url}")
+
+        cards = parse_jobs(body)
+
+        if not cards:
+            break
+
+        pages += 1
+        if start == 0:
+            top_id = next((card['id'] for card in cards if card['id']), None)
+        page_end = start + len(cards)
+        # A skip can land mid-page; the cards above it were handled
+        cards = cards[handled - start:]
+        if not cards:
+            break
+
+        skip_to = None
+        caught_up = False
+        ids = [card['id'] for card in cards]
+        found = next((i for i, span in enumerate(spans) if span[0] in ids), None)
+        if found is not None:
+            # Newer spans than the one found lie above it; their first jobs are gone
+            reached = ids.index(spans[found][0])
+            length = spans[found][1]
+            del spans[:found + 1]
+            cards = cards[:reached]
+            if length is None:
+                caught_up = True
+            else:
+                # The earlier run's offsets have shifted by the jobs posted since
+                skip_to = handled + reached + length
+
+        new_cards = [card for card in cards if seen is None or card['id'] not in seen]
+        if not new_cards and skip_to is None and not caught_up:
+            if not spans:
+                print("Page already seen, stopping")
+                break
+            length = spans[0][1]
+            if length is None:
+                print("Caught up with the previous run")
+                break
+            # Inside the next span, whose first job is gone; it ends no sooner than this
+            inside = True
+            skip_to = max(page_end, length)
+        elif new_cards and inside and found is None:
+            # Past the end of the span we were inside
+            del spans[0]
+        if found is not None or new_cards:
+            inside = False
+
+        page_stale = bool(new_cards)
+        page_jobs = []
+
+        for card in new_cards:
+            job = registry.get(card['id']) if registry is not None else None
+            if job is None and not is_recent(card['time_posted'], card['datetime'], now, window):
+                stale_streak += 1
+                continue
+
+            stale_streak = 0
+            page_stale = False
+            if job is None and card['title'] and card['url']:
+                job = job_from_card(card, key, now)
+                if registry is not None:
+                    job = registry.add(job)
+            if job is not None:
+                page_jobs.append(job)
+
+        # A page counts as handled once the consumer has taken it
+        checkpoint["spans"] = handled_spans(top_id, handled, spans)
+        if page_jobs:
+            yield page_jobs
+        handled = page_end if skip_to is None else skip_to
+        checkpoint["spans"] = handled_spans(top_id, handled, spans)
+
+        if caught_up:
+            print("Caught up with the previous run")
+            break
+        if skip_to is None and (page_stale or stale_streak >= stale_run):
+            break
+        if skip_to is not None:
+            stale_streak = 0
+        start = handled // 10 * 10
+        await fetcher.pause()
+    else:
+        print(f"Stopped after {max_pages} pages")
+        return
+
+    checkpoint["spans"] = handled_spans(top_id, None, [])
+    checkpoint["last_success"] = started
+
+def handled_spans(top_id, handled, older):
+    """Return the spans after a run that began at top_id and handled that many results."""
+    return ([[top_id, handled]] if top_id and handled != 0 else []) + older
+
+def checkpoint_spans(checkpoint):
+    """Return a copy of a checkpoint's handled spans, reading the older newest_id form too."""
+    if "spans" in checkpoint:
+        return [list(span) for span in checkpoint["spans"]]
+    newest_id = checkpoint.pop("newest_id", None)
+    resume_start = checkpoint.pop("resume_start", None)
+    return [[newest_id, resume_start]] if newest_id else []
+
+def route_jobs(jobs, index, mask, registry=None, claims=None):
+    """Return {channel_id: jobs} for the channels in mask, scanning each title once.
+
+    With a registry, titles are matched once per run and a channel never
+    gets a job that an earlier query already routed to it. With a claims
+    store, the same holds across runs sharing it, such as parallel shards.
+    """
+    routed = {}
+    for job in jobs:
+        matched = index.match(job.title_normalized) if registry is None else registry.match(job, index)
+        for cfg in index.channels_for(matched & mask):
+            channel_id = cfg["channel_id"]
+            if registry is not None and not registry.claim(job, channel_id):
+                continue
+            selected = routed.setdefault(channel_id, [])
+            if not selected or selected[-1] is not job:
+                selected.append(job)
+
+    if claims is not None and routed:
         try:
-            response = requests.get(
-                WEBSITE_URL,
-                headers=get_headers(),
-                params={**params, "start": start},
+            granted = claims.claim_posts(
+                [(channel_id, job.id) for channel_id, selected in routed.items() for job in selected if job.id]
             )
+        except sqlite3.Error as e:
+            # Posting a job twice beats losing it
+            print(f"Could not claim posts, sending them unclaimed: {e}")
+        else:
+            routed = {
+                channel_id: [job for job in selected if not job.id or (channel_id, job.id) in granted]
+                for channel_id, selected in routed.items()
+            }
+    return routed
 
-            if response.status_code != 200:
-                print(f"Error: Status {response.status_code}")
-                time.sleep(2)
-                continue
+def build_embed(job):
+    lines = [f"**Company:** {job.company}"]
+    if job.location:
+        lines.append(f"**Location:** {job.location}")
+    if job.posted_at:
+        lines.append(f"**Posted:** {discord.utils.format_dt(job.posted_at, 'R')}")
+    return discord.Embed(
+        title=job.title,
+        url=job.canonical_url,
+        description="\n".join(lines),
+        color=0x0099ff
+    )
 
-            soup = BeautifulSoup(response.text, 'html.parser')
-            jobs = soup.find_all("li")
+async def scrape_and_post(
+    channel_configs, channels, seen, url=WEBSITE_URL, now=None, deadline=None, state=None, shard=None,
+    **fetcher_options
+):
+    """Fetch every distinct query once and post matching jobs to their channels.
 
-            if not jobs:
-                break
+    Runs as a streaming pipeline: each query yields pages into a bounded
+    queue, a routing stage matches them against every channel, and the
+    posting workers send them. When Discord falls behind the full queues
+    pause fetching. channels maps channel ids to anything with an async
+    send(embeds=...).
 
-            for job in jobs:
-                try:
-                    title = job.find('h3').get_text().strip() if job.find('h3') else None
-                    company = job.find('h4').get_text().strip() if job.find('h4') else None
-                    url = job.find('a')['href'] if job.find('a') else None
-                    time_posted = job.find('time').get_text().strip() if job.find('time') else None
+    deadline is a time.monotonic() value the run must finish by. Scraping
+    stops early enough to leave posting its reserve, and whatever is still
+    unposted at the deadline is saved to the state store, whose pending
+    posts go out first on the next run. The state store also keeps each
+    query's yield history, which decides the fetch order, and the post
+    claims that stop parallel runs from posting a job twice.
 
-                    if title and url and is_recent(time_posted):
-                        all_jobs.append({
-                            'title': title,
-                            'company': company,
-                            'url': url,
-                            'time_posted': time_posted
-                        })
+    Each query skips the jobs it has seen itself, so a job found first by
+    another query still reaches this one's channels; the registry and the
+    claims keep any channel from getting it twice.
 
-                except Exception as e:
-                    print(f"Error processing job: {e}")
+    shard (see shards.py) limits the run to some channels or queries.
+    """
+    ready = shard_channels([cfg for cfg in channel_configs if cfg["channel_id"] in channels], shard)
+    plan = shard_plan(plan_queries(ready), shard)
+    index = keyword_index(channel_configs)
+    masks = {key: index.mask_for(query["channels"]) for key, query in plan.items()}
+    pages = asyncio.Queue(maxsize=PAGE_QUEUE_SIZE)
+    registry = JobRegistry()
+    scopes = {key: shard_scope(key, query, shard) for key, query in plan.items()}
+    saved = state.query_states(scopes.values()) if state is not None else {}
+    states = {key: saved[scope] for key, scope in scopes.items() if scope in saved}
+    found = dict.fromkeys(plan, 0)
+    failed = set()
+    routed_ids = {key: set() for key in plan}
+    print(f"Fetching {len(plan)} unique queries for {len(ready)} channels")
 
-            start += 10
-            time.sleep(1 + random.random())
+    poster = PostScheduler(channels, deadline=deadline)
+    if state is not None:
+        for channel_id, saved in state.take_pending(cfg["channel_id"] for cfg in ready).items():
+            await poster.submit({channel_id: [job_from_dict(data) for data in saved]})
 
-        except Exception as e:
+    now = now or now_utc()
+
+    async def produce(fetcher, key, query):
+        try:
+            async for jobs in iter_job_pages(
+                fetcher, query["params"], seen.scoped(scopes[key]), url=url, now=now, registry=registry,
+                checkpoint=states.get(key),
+            ):
+                found[key] += len(jobs)
+                await pages.put((key, jobs))
+        except FetchError as e:
             print(f"Fetch error: {e}")
-            break
+            failed.add(key)
 
-    return all_jobs
+    def route_page(key, jobs):
+        """Route one page and mark its jobs seen, or return None if routing fails."""
+        # One bad page must not stop the stage: producers would block on the full queue
+        try:
+            routed = route_jobs(jobs, index, masks[key], registry, state)
+        except Exception as e:
+            print(f"Routing error, skipping {len(jobs)} jobs: {e}")
+            return None
+        routed_ids[key].update(job.id for job in jobs)
+        return routed
 
-def filter_jobs(jobs, include_list, exclude_list):
-    """Return jobs matching include/exclude keywords."""
-    filtered = []
+    async def route():
+        while True:
+            item = await pages.get()
+            if item is None:
+                break
+            routed = route_page(*item)
+            if routed is None:
+                continue
+            in_flight.update(routed)
+            await poster.submit(routed)
+            in_flight.clear()
+
+    async def finish_routing():
+        await pages.put(None)
+        await router
+
+    # Jobs the router has claimed but not yet handed to the poster
+    in_flight = {}
+    router = asyncio.create_task(route())
+    unfinished = set()
+    unsent = {}
+    try:
+        async with create_session() as session:
+            fetcher = Fetcher(session, **fetcher_options)
+            # Producers start in priority order, so they queue for fetch slots in that order
+            producers = {
+                asyncio.create_task(produce(fetcher, key, plan[key])): key
+                for key in order_queries(plan, states)
+            }
+            if producers:
+                _, late = await asyncio.wait(producers, timeout=time_left(scrape_deadline(deadline)))
+                for task in late:
+                    task.cancel()
+                await asyncio.gather(*late, return_exceptions=True)
+                unfinished = {producers[task] for task in late}
+                if unfinished:
+                    print(f"Out of time: {len(unfinished)} queries cut short")
+                # A failed query is as unfinished as one cut off by the deadline
+                unfinished |= failed
+        try:
+            await asyncio.wait_for(finish_routing(), time_left(deadline))
+        except asyncio.TimeoutError:
+            print("Out of time while routing")
+    finally:
+        router.cancel()
+        await asyncio.gather(router, return_exceptions=True)
+        unsent = await poster.close(deadline)
+        # Pages that never reached the poster are routed now and saved with the rest
+        leftovers = [in_flight]
+        while not pages.empty():
+            item = pages.get_nowait()
+            if item is not None:
+                leftovers.append(route_page(*item) or {})
+        for routed in leftovers:
+            for channel_id, jobs in routed.items():
+                unsent.setdefault(channel_id, []).extend(jobs)
+
+    for key, ids in routed_ids.items():
+        seen.scoped(scopes[key]).add_many(ids)
+    if state is not None:
+        for channel_id, jobs in unsent.items():
+            state.add_pending(channel_id, [job_to_dict(job) for job in jobs])
+        if unsent:
+            print(f"Saved {sum(map(len, unsent.values()))} unposted jobs for the next run")
+        state.put_query_states(
+            {scopes[key]: record_run(states.get(key, {}), found[key], key not in unfinished) for key in plan}
+        )
+
+def build_digest(jobs):
+    """Return compact list embeds, one line per job, for large bursts.
+
+    Each embed comes paired with the jobs it lists.
+    """
+    parts = []
+    description = ""
+    listed = []
     for job in jobs:
-        title = job["title"].lower()
+        title = discord.utils.escape_markdown(job.title).replace("[", "\\[").replace("]", "\\]")
+        line = f"• [{title}]({job.canonical_url}) — {job.company}"
+        if description and len(description) + len(line) + 1 > MAX_EMBED_DESCRIPTION:
+            parts.append((description, listed))
+            description = ""
+            listed = []
+        description = f"{description}\n{line}" if description else line
+        listed.append(job)
+    parts.append((description, listed))
 
-        has_include = include_list and any(kw.lower() in title for kw in include_list)
-        has_exclude = any(kw.lower() in title for kw in exclude_list)
+    return [
+        (discord.Embed(title=f"{len(jobs)} new jobs", description=text, color=0x0099ff), listed)
+        for text, listed in parts
+    ]
 
-        if has_include and not has_exclude:
-            filtered.append(job)
+def pack_embeds(embeds):
+    """Group embeds into as few messages as Discord's per-message limits allow."""
+    batch = []
+    chars = 0
+    for embed in embeds:
+        size = len(embed)
+        if batch and (len(batch) == MAX_EMBEDS_PER_MESSAGE or chars + size > MAX_EMBED_CHARS_PER_MESSAGE):
+            yield batch
+            batch = []
+            chars = 0
+        batch.append(embed)
+        chars += size
+    if batch:
+        yield batch
+
+async def send_jobs(channel_id, channel, jobs, limiter=None):
+    """Send jobs to one channel, several per message.
+
+    Returns the jobs left unsent when Discord rejects a message: those in
+    it and in every message after it. A client error other than a rate
+    limit (a deleted channel, lost access) won't go away on a retry, so
+    those jobs are dropped instead.
+    """
+    if len(jobs) > DIGEST_THRESHOLD:
+        entries = build_digest(jobs)
+    else:
+        entries = [(build_embed(job), [job]) for job in jobs]
+
+    sent = 0
+    try:
+        for batch in pack_embeds([embed for embed, _ in entries]):
+            if limiter is not None:
+                await limiter.wait()
+            await channel.send(embeds=batch)
+            sent += len(batch)
+    except discord.HTTPException as e:
+        if 400 <= e.status < 500 and e.status != 429:
+            print(f"Dropping {sum(len(listed) for _, listed in entries[sent:])} jobs rejected by channel {channel_id}: {e}")
+            return []
+        print(f"Failed to post to channel {channel_id}: {e}")
+    return [job for _, listed in entries[sent:] for job in listed]
 
-    return filtered
+class RequestSpacer:
+    """Keep request starts at least 1/rate seconds apart."""
 
-async def run_discord_bot(channel_configs):
+    def __init__(self, rate):
+        self.interval = 1 / rate
+        self._next_at = 0.0
+
+    async def wait(self):
+        now = asyncio.get_running_loop().time()
+        start_at = max(now, self._next_at)
+        self._next_at = start_at + self.interval
+        if start_at > now:
+            await asyncio.sleep(start_at - now)
+
+class PostScheduler:
+    """Post to every channel concurrently with one worker per channel.
+
+    Each Discord channel has its own rate-limit bucket, so workers only share
+    the global request rate. Jobs submitted while a worker is busy are sent
+    together in its next batch.
+    """
+
+    def __init__(self, channels, rate=GLOBAL_POST_RATE, deadline=None):
+        self.channels = channels
+        self.limiter = RequestSpacer(rate)
+        self.deadline = deadline
+        self.unsent = {}
+        self._queues = {}
+        self._workers = []
+        self._sending = {}
+
+    async def submit(self, routed):
+        """Queue routed jobs ({channel_id: jobs}), waiting while a channel's queue is full."""
+        for channel_id, jobs in routed.items():
+            if not jobs:
+                continue
+            queue = self._queues.get(channel_id)
+            if queue is None:
+                queue = self._queues[channel_id] = asyncio.Queue(maxsize=POST_QUEUE_SIZE)
+                self._workers.append(asyncio.create_task(self._work(channel_id, queue)))
+            await queue.put(jobs)
+
+    async def _work(self, channel_id, queue):
+        channel = self.channels[channel_id]
+        done = False
+        while not done:
+            jobs = await queue.get()
+            if jobs is None:
+                break
+            jobs = list(jobs)
+            while not queue.empty():
+                more = queue.get_nowait()
+                if more is None:
+                    done = True
+                    break
+                jobs.extend(more)
+
+            # Past the deadline, keep draining but set the jobs aside
+            if self.deadline is not None and time.monotonic() >= self.deadline:
+                self.unsent.setdefault(channel_id, []).extend(jobs)
+                continue
+
+            self._sending[channel_id] = jobs
+            try:
+                failed = await send_jobs(channel_id, channel, jobs, self.limiter)
+            except Exception as e:
+                # Part of the batch may have gone out; posting some twice beats losing them
+                print(f"Posting error for channel {channel_id}: {e}")
+                failed = jobs
+            del self._sending[channel_id]
+            if failed:
+                self.unsent.setdefault(channel_id, []).extend(failed)
+
+    async def close(self, deadline=None):
+        """Wait for every queued job to be posted, or until deadline.
+
+        Returns {channel_id: jobs} that were not posted, because Discord
+        rejected them or time ran out. Sends cut off at the deadline count as
+        unposted: posting one twice beats losing it.
+        """
+        async def finish():
+            for queue in self._queues.values():
+                await queue.put(None)
+            await asyncio.gather(*self._workers)
+
+        try:
+            await asyncio.wait_for(finish(), time_left(deadline))
+        except asyncio.TimeoutError:
+            for task in self._workers:
+                task.cancel()
+            await asyncio.gather(*self._workers, return_exceptions=True)
+            for channel_id, jobs in self._sending.items():
+                self.unsent.setdefault(channel_id, []).extend(jobs)
+            for channel_id, queue in self._queues.items():
+                while not queue.empty():
+                    jobs = queue.get_nowait()
+                    if jobs is not None:
+                        self.unsent.setdefault(channel_id, []).extend(jobs)
+        return self.unsent
+
+def create_bot():
     intents = discord.Intents.default()
     intents.message_content = True
-    bot = commands.Bot(command_prefix='/', intents=intents)
+    return commands.Bot(command_prefix='/', intents=intents)
+
+def resolve_channels(bot, channel_configs):
+    """Return {channel_id: channel} for the configured channels the bot can see."""
+    channels = {}
+    for cfg in channel_configs:
+        channel = bot.get_channel(cfg["channel_id"])
+
+        if not channel:
+            print(f"Channel not found: {cfg['channel_id']}")
+            continue
+
+        channels[cfg["channel_id"]] = channel
+    return channels
+
+def rest_channels(client, channel_configs, session):
+    """Return {channel_id: destination} for posting without a gateway connection.
+
+    Channels with a webhook post through it; the rest go through the bot's
+    REST client as partial messageables, which needs no guild cache.
+    """
+    channels = {}
+    for cfg in channel_configs:
+        if cfg.get("webhook_url"):
+            try:
+                channels[cfg["channel_id"]] = discord.Webhook.from_url(cfg["webhook_url"], session=session)
+            except ValueError:
+                print(f"Invalid webhook URL for channel {cfg['channel_id']}")
+        elif client.user is not None:
+            channels[cfg["channel_id"]] = client.get_partial_messageable(cfg["channel_id"])
+        else:
+            print(f"No bot login or webhook for channel {cfg['channel_id']}")
+    return channels
+
+async def run_once(channel_configs, channels, deadline=None, shard=None):
+    """Scrape and post once with the local stores, unless the shard is already running."""
+    seen = SeenStore()
+    state = StateStore()
+    lease = f"shard:{shard_name(shard)}"
+    owner = uuid.uuid4().hex
+    ttl = SHARD_LEASE_TTL if deadline is None else time_left(deadline)
+    try:
+        if not state.acquire_lease(lease, owner, ttl):
+            print(f"Shard {shard_name(shard)} is already running, skipping")
+            return
+        try:
+            await scrape_and_post(channel_configs, channels, seen, deadline=deadline, state=state, shard=shard)
+        finally:
+            state.release_lease(lease, owner)
+    finally:
+        state.close()
+        seen.close()
+
+async def run_rest_poster(channel_configs, deadline=None, shard=None):
+    """One-shot run that posts over the REST API and webhooks, never opening the gateway."""
+    client = discord.Client(intents=discord.Intents.none())
+
+    async with client, aiohttp.ClientSession() as session:
+        if DISCORD_BOT_TOKEN:
+            try:
+                await client.login(DISCORD_BOT_TOKEN)
+            except discord.HTTPException as e:
+                print(f"Bot login failed: {e}")
+
+        channels = rest_channels(client, channel_configs, session)
+        await run_once(channel_configs, channels, deadline, shard)
+
+async def run_discord_bot(channel_configs, deadline=None, shard=None):
+    bot = create_bot()
 
     @bot.event
     async def on_ready():
         print(f"Bot ready: {bot.user}")
 
-        for cfg in channel_configs:
-            channel = bot.get_channel(cfg["channel_id"])
+        channels = resolve_channels(bot, channel_configs)
+        try:
+            await run_once(channel_configs, channels, deadline, shard)
+        finally:
+            await bot.close()
 
-            if not channel:
-                print(f"Channel not found: {cfg['channel_id']}")
-                continue
+    try:
+        await bot.start(DISCORD_BOT_TOKEN)
+    except Exception as e:
+        print(f"Bot error: {e}")
+
+async def poll_query(fetcher, key, query, index, poster, seen, scheduler, claims):
+    """Poll one query forever at the scheduler's interval, backing off on failures.
+
+    The query keeps its own seen ids, so a job another query found first
+    still reaches this query's channels; claims stop any channel getting it twice.
+    """
+    mask = index.mask_for(query["channels"])
+    seen = seen.scoped(key)
+    checkpoint = {}
+    failures = 0
 
-            jobs = fetch_jobs(cfg["params"])
-            selected_jobs = filter_jobs(jobs, cfg["include"], cfg["exclude"])
+    # Spread the first polls so queries don't hit LinkedIn in lockstep
+    await asyncio.sleep(random.uniform(0, scheduler.interval(key) * POLL_JITTER))
 
-            for job in selected_jobs:
-                embed = discord.Embed(
-                    title=job['title'],
-                    url=job['url'],
-                    description=f"**Company:** {job['company']}\n**Posted:** {job['time_posted']}",
-                    color=0x0099ff
-                )
-                await channel.send(embed=embed)
+    while True:
+        started = asyncio.get_running_loop().time()
+        sent = fetcher.requests.get(key, 0)
+        new_jobs = 0
+        try:
+            async for jobs in iter_job_pages(fetcher, query["params"], seen, checkpoint=checkpoint):
+                new_jobs += len(jobs)
+                await poster.submit(route_jobs(jobs, index, mask, claims=claims))
+                seen.add_many(job.id for job in jobs)
+            failures = 0
+            scheduler.record(key, new_jobs, fetcher.requests.get(key, 0) - sent)
+            # The search window stretches to the gap since this poll, so a long wait misses nothing
+            delay = scheduler.interval(key) * (1 - POLL_JITTER * random.random())
+        except Exception as e:
+            failures += 1
+            delay = min(scheduler.interval(key) * 2 ** failures, MAX_POLL_BACKOFF)
+            print(f"Poll error ({failures} in a row): {e}")
+
+        elapsed = asyncio.get_running_loop().time() - started
+        await asyncio.sleep(max(0, delay - elapsed))
+
+async def run_daemon(channel_configs):
+    """Stay connected and poll every query on its own schedule."""
+    bot = create_bot()
+    session = create_session()
+    seen = SeenStore()
+    state = StateStore()
+    tasks = []
+    poster = None
+
+    @bot.event
+    async def on_ready():
+        nonlocal poster
+        print(f"Bot ready: {bot.user}")
+        # on_ready fires again after gateway reconnects
+        if poster is not None:
+            return
+
+        channels = resolve_channels(bot, channel_configs)
+        ready = [cfg for cfg in channel_configs if cfg["channel_id"] in channels]
+        index = keyword_index(channel_configs)
+        fetcher = Fetcher(session)
+        poster = PostScheduler(channels)
+        for channel_id, saved in state.take_pending(cfg["channel_id"] for cfg in ready).items():
+            await poster.submit({channel_id: [job_from_dict(data) for data in saved]})
+        plan = plan_queries(ready)
+        intervals = {key: poll_interval(query["params"]) for key, query in plan.items()}
+        if POLL_REQUEST_BUDGET:
+            budget = float(POLL_REQUEST_BUDGET) / 3600
+        else:
+            budget = sum(1 / interval for interval in intervals.values())
+        scheduler = PollScheduler(
+            intervals,
+            budget,
+            MIN_POLL_INTERVAL,
+            MAX_POLL_INTERVAL,
+        )
 
-        await bot.close()
+        for key, query in plan.items():
+            tasks.append(asyncio.create_task(poll_query(fetcher, key, query, index, poster, seen, scheduler, state)))
+        print(f"Polling {len(tasks)} queries")
 
     try:
         await bot.start(DISCORD_BOT_TOKEN)
     except Exception as e:
         print(f"Bot error: {e}")
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if poster is not None:
+            for channel_id, jobs in (await poster.close()).items():
+                state.add_pending(channel_id, [job_to_dict(job) for job in jobs])
+        await session.close()
+        state.close()
+        seen.close()
 
 def lambda_handler(event, context):
+    """Run once, or only a shard with {"shard": ...}.
+
+    {"coordinate": N} runs nothing and returns one event per shard in
+    "shards", for a fan-out step to invoke in parallel.
+    """
+    event = event or {}
+    if event.get("coordinate"):
+        return {'statusCode': 200, 'shards': shard_events(int(event["coordinate"]))}
+    try:
+        shard = parse_shard(event.get("shard"))
+    except (TypeError, ValueError) as e:
+        return {'statusCode': 400, 'body': f"Bad shard: {e}"}
+
+    deadline = run_deadline(context)
     channel_configs = load_config()
-    asyncio.run(run_discord_bot(channel_configs))
+    if POST_MODE == "gateway":
+        asyncio.run(run_discord_bot(channel_configs, deadline, shard))
+    else:
+        asyncio.run(run_rest_poster(channel_configs, deadline, shard))
     return {'statusCode': 200, 'body': 'Done'}
+
+def coordinate(count):
+    """Run every N-of-count shard as a local process and wait for all of them."""
+    processes = [
+        subprocess.Popen([sys.executable, os.path.abspath(__file__), "--shard", f"{index}/{count}"])
+        for index in range(count)
+    ]
+    return max(process.wait() for process in processes)
+
+def main():
+    parser = argparse.ArgumentParser(description="Post new LinkedIn jobs to Discord channels.")
+    parser.add_argument("--daemon", action="store_true", help="keep running and poll each query on its own interval")
+    parser.add_argument("--shard", help='run part of the work: "2/8", a hash range "0:0.5" or channel env names')
+    parser.add_argument("--coordinate", type=int, metavar="N", help="run N shards as parallel local processes")
+    args = parser.parse_args()
+
+    if args.daemon:
+        asyncio.run(run_daemon(load_config()))
+    elif args.coordinate:
+        sys.exit(coordinate(args.coordinate))
+    else:
+        result = lambda_handler({"shard": args.shard}, None)
+        if result['statusCode'] != 200:
+            sys.exit(result['body'])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""Async HTTP fetching shared by every LinkedIn query in a run."""
+import asyncio
+import random
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import aiohttp
+
+# Politeness budget
+MAX_CONCURRENT_REQUESTS = 6
+MAX_REQUESTS_PER_HOST = 2
+PAGE_DELAY = (1.0, 2.0)  # seconds a query waits before requesting its next page
+REQUEST_TIMEOUT = 30
+
+# Connection pool: idle keep-alive connections are reused across pages and queries
+POOL_SIZE = MAX_CONCURRENT_REQUESTS
+POOL_SIZE_PER_HOST = MAX_REQUESTS_PER_HOST
+KEEPALIVE_TIMEOUT = 75
+DNS_CACHE_TTL = 600
+
+# Adaptive per-host rate (requests/second): additive increase on success,
+# multiplicative decrease when the host throttles or fails
+HOST_RATE = 2.0
+MIN_HOST_RATE = 0.1
+MAX_HOST_RATE = 5.0
+HOST_BURST = 2
+RATE_INCREASE = 0.05
+RATE_DECREASE = 0.5
+
+# Retries: exponential backoff with full jitter, Retry-After honoured up to a cap
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_RETRIES_PER_PAGE = 4
+BACKOFF_BASE = 1.0
+MAX_BACKOFF = 60.0
+MAX_RETRY_AFTER = 300.0
+# Retry budget shared by all queries: starts full and earns back a fraction
+# of a retry per successful request, so a failing host can't multiply load
+RETRY_BUDGET = 20
+RETRY_BUDGET_RATIO = 0.1
+
+# Circuit breaker: a query that fails this many pages in a row pauses
+CIRCUIT_FAILURES = 3
+CIRCUIT_COOLDOWN = 900
+
+
+class FetchError(Exception):
+    """A page could not be fetched within the retry policy."""
+
+
+class CircuitOpenError(FetchError):
+    """The query is paused after repeated failures."""
+
+
+def create_session(
+    pool_size=POOL_SIZE,
+    pool_size_per_host=POOL_SIZE_PER_HOST,
+    keepalive_timeout=KEEPALIVE_TIMEOUT,
+    dns_cache_ttl=DNS_CACHE_TTL,
+):
+    """Return the pooled aiohttp session used for scraping."""
+    connector = aiohttp.TCPConnector(
+        limit=pool_size,
+        limit_per_host=pool_size_per_host,
+        keepalive_timeout=keepalive_timeout,
+        use_dns_cache=True,
+        ttl_dns_cache=dns_cache_ttl,
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+    )
+
+
+class TokenBucket:
+    """Token bucket whose refill rate adapts to how the host responds."""
+
+    def __init__(self, rate=HOST_RATE, burst=HOST_BURST, min_rate=MIN_HOST_RATE, max_rate=MAX_HOST_RATE):
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.tokens = burst
+        self.blocked_until = 0.0
+        self._updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                await asyncio.sleep(self.blocked_until - now)
+                continue
+            self._refill(now)
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def succeeded(self):
+        self.rate = min(self.max_rate, self.rate + RATE_INCREASE)
+
+    def throttled(self, retry_after=None):
+        self.rate = max(self.min_rate, self.rate * RATE_DECREASE)
+        if retry_after:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+
+
+def parse_retry_after(value):
+    """Return the seconds to wait from a Retry-After header, or None."""
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER)
+
+
+class Fetcher:
+    """Issue GET requests under a global concurrency cap and a per-host budget.
+
+    Each host gets an adaptive token bucket. Throttled or failed requests are
+    retried with backoff while the shared retry budget allows, and a query
+    whose pages keep failing is paused by a circuit breaker.
+    """
+
+    def __init__(
+        self,
+        session,
+        max_concurrent=MAX_CONCURRENT_REQUESTS,
+        max_per_host=MAX_REQUESTS_PER_HOST,
+        host_rate=HOST_RATE,
+        page_delay=PAGE_DELAY,
+        max_retries=MAX_RETRIES_PER_PAGE,
+        retry_budget=RETRY_BUDGET,
+    ):
+        self.session = session
+        self.max_per_host = max_per_host
+        self.host_rate = host_rate
+        self.page_delay = page_delay
+        self.max_retries = max_retries
+        self.retry_budget_cap = retry_budget
+        self.retry_budget = retry_budget
+        self.requests = {}  # requests sent per query key, retries included
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._hosts = {}
+        self._circuits = {}
+
+    def _host_state(self, host):
+        state = self._hosts.get(host)
+        if state is None:
+            bucket = TokenBucket(self.host_rate) if self.host_rate else None
+            state = {"slots": asyncio.Semaphore(self.max_per_host), "bucket": bucket}
+            self._hosts[host] = state
+        return state
+
+    async def pause(self):
+        """Wait between two pages of the same query."""
+        delay = random.uniform(*self.page_delay)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def _get(self, state, url, params, headers):
+        async with state["slots"]:
+            async with self._slots:
+                if state["bucket"] is not None:
+                    await state["bucket"].acquire()
+                async with self.session.get(url, params=params, headers=headers) as response:
+                    return response.status, response.headers.get("Retry-After"), await response.text()
+
+    def _spend_retry(self):
+        if self.retry_budget < 1:
+            return False
+        self.retry_budget -= 1
+        return True
+
+    def circuit_open(self, key):
+        circuit = self._circuits.get(key)
+        return circuit is not None and time.monotonic() < circuit["open_until"]
+
+    def _record(self, key, ok):
+        if key is None:
+            return
+        circuit = self._circuits.setdefault(key, {"failures": 0, "open_until": 0.0})
+        if ok:
+            circuit["failures"] = 0
+            return
+        circuit["failures"] += 1
+        if circuit["failures"] >= CIRCUIT_FAILURES:
+            circuit["open_until"] = time.monotonic() + CIRCUIT_COOLDOWN
+            circuit["failures"] = 0
+            print(f"Pausing query {key} for {CIRCUIT_COOLDOWN} s after repeated failures")
+
+    async def get_text(self, url, params=None, headers=None, key=None):
+        """Return (status, body) for a GET request, retrying throttling and server errors.
+
+        key identifies the query for the circuit breaker. Raises FetchError
+        when retries run out and CircuitOpenError while the query is paused.
+        """
+        if key is not None and self.circuit_open(key):
+            raise CircuitOpenError(f"Query {key} is paused")
+
+        state = self._host_state(urlsplit(url).hostname)
+        attempt = 0
+
+        while True:
+            retry_after = None
+            self.requests[key] = self.requests.get(key, 0) + 1
+            try:
+                status, retry_after, body = await self._get(state, url, params, headers)
+                error = f"status {status}"
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                status = None
+                error = str(e) or type(e).__name__
+
+            if status is not None and status not in RETRY_STATUSES:
+                if state["bucket"] is not None:
+                    state["bucket"].succeeded()
+                self.retry_budget = min(self.retry_budget_cap, self.retry_budget + RETRY_BUDGET_RATIO)
+                self._record(key, True)
+                return status, body
+
+            wait = parse_retry_after(retry_after)
+            if state["bucket"] is not None:
+                state["bucket"].throttled(wait)
+
+            attempt += 1
+            if attempt > self.max_retries or not self._spend_retry():
+                self._record(key, False)
+                raise FetchError(f"Giving up on {url} after {attempt} attempts: {error}")
+
+            if wait is None:
+                wait = random.uniform(0, min(MAX_BACKOFF, BACKOFF_BASE * 2 ** attempt))
+            print(f"Retrying in {wait:.1f} s ({error})")
+            await asyncio.sleep(wait)
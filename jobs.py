@@ -0,0 +1,146 @@
+"""Job records built once per scraped card."""
+import re
+import sys
+from dataclasses import asdict, dataclass
+from datetime import datetime
+
+from yarl import URL
+
+from recency import posted_at
+
+CANONICAL_URL = "https://www.linkedin.com/jobs/view/{}/"
+
+# The last path segment after /jobs/view/ is "<slug>-<id>" or just "<id>"
+JOB_ID_SEGMENT = re.compile(r"(?:.*-)?(\d+)")
+
+
+@dataclass(frozen=True, slots=True)
+class Job:
+    """One LinkedIn posting, immutable once parsed.
+
+    title_normalized is the lowercased title the keyword matchers expect.
+    Company and location names repeat across cards and queries, so they are
+    interned and every job shares one copy of each.
+    """
+
+    id: str
+    title: str
+    title_normalized: str
+    company: str
+    url: str
+    canonical_url: str
+    posted_at: datetime | None
+    location: str
+    query_key: str | None
+
+
+def canonicalize(url):
+    """Return (job_id, canonical_url) for a LinkedIn job link.
+
+    Any country subdomain, title slug and tracking query (refId, trackingId,
+    position, pageNum) collapse to the same short link. Links without a job
+    id give (None, url).
+    """
+    if not url:
+        return None, url
+    try:
+        parsed = URL(url)
+    except (TypeError, ValueError):
+        return None, url
+
+    job_id = parsed.query.get("currentJobId")
+    parts = parsed.parts
+    for i in range(len(parts) - 2):
+        if parts[i] == "jobs" and parts[i + 1] == "view":
+            match = JOB_ID_SEGMENT.fullmatch(parts[i + 2])
+            if match:
+                job_id = match.group(1)
+            break
+
+    if not job_id or not job_id.isdigit():
+        return None, url
+    return job_id, CANONICAL_URL.format(job_id)
+
+
+def job_from_card(card, query_key=None, now=None):
+    """Build a Job from a parsed card dict."""
+    title = card['title']
+    return Job(
+        id=card['id'],
+        title=title,
+        title_normalized=title.lower(),
+        company=sys.intern(card['company'] or ""),
+        url=card['url'],
+        canonical_url=card['canonical_url'],
+        posted_at=posted_at(card['time_posted'], card['datetime'], now),
+        location=sys.intern(card['location'] or ""),
+        query_key=query_key,
+    )
+
+
+def job_to_dict(job):
+    """Return a JSON-serializable dict for a Job."""
+    data = asdict(job)
+    if job.posted_at is not None:
+        data["posted_at"] = job.posted_at.isoformat()
+    return data
+
+
+def job_from_dict(data):
+    """Rebuild a Job saved with job_to_dict."""
+    posted = data.get("posted_at")
+    return Job(**{
+        **data,
+        "company": sys.intern(data["company"]),
+        "location": sys.intern(data["location"]),
+        "posted_at": datetime.fromisoformat(posted) if posted else None,
+    })
+
+
+class JobRegistry:
+    """Jobs found during one run, keyed by LinkedIn job id.
+
+    Overlapping queries surface the same posting. The registry hands back
+    the Job built the first time, remembers its keyword match, and records
+    which channels it was routed to so no channel receives it twice. Jobs
+    without an id bypass it.
+    """
+
+    def __init__(self):
+        self._jobs = {}
+        self._matches = {}
+        self._delivered = {}
+
+    def __len__(self):
+        return len(self._jobs)
+
+    def __iter__(self):
+        return iter(self._jobs)
+
+    def get(self, job_id):
+        return self._jobs.get(job_id) if job_id else None
+
+    def add(self, job):
+        """Register a job and return the instance to use for its id."""
+        if not job.id:
+            return job
+        return self._jobs.setdefault(job.id, job)
+
+    def match(self, job, index):
+        """Return the job's channel bitmask from index, matching its title once."""
+        mask = self._matches.get(job.id)
+        if mask is None:
+            mask = index.match(job.title_normalized)
+            if job.id:
+                self._matches[job.id] = mask
+        return mask
+
+    def claim(self, job, channel_id):
+        """Return True the first time a job is routed to a channel."""
+        if not job.id:
+            return True
+        delivered = self._delivered.setdefault(job.id, set())
+        if channel_id in delivered:
+            return False
+        delivered.add(channel_id)
+        return True
@@ -0,0 +1,116 @@
+"""Keyword matching for job titles."""
+
+
+def parse_keyword(keyword):
+    """Return (lowercased keyword, whole_word) for one config keyword.
+
+    A keyword in single quotes, such as 'qa', only matches as a whole word.
+    """
+    keyword = keyword.strip().lower()
+    if len(keyword) > 2 and keyword[0] == keyword[-1] == "'":
+        return keyword[1:-1].strip(), True
+    return keyword, False
+
+
+def _is_word_char(char):
+    return char.isalnum() or char == "_"
+
+
+class KeywordIndex:
+    """Aho-Corasick automaton over the keywords of every channel.
+
+    Each keyword maps to bitmasks of the channels that include or exclude
+    it, so one pass over a title decides routing for all channels at once.
+    Channels are identified by their position in the list given at build time.
+    Keywords in single quotes, or all of a channel's with "whole_words",
+    match whole words only.
+    """
+
+    def __init__(self, channel_configs):
+        self.channels = list(channel_configs)
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+
+        entries = {}
+        for bit, cfg in enumerate(self.channels):
+            whole_words = bool(cfg.get("whole_words"))
+            for field in ("include", "exclude"):
+                for keyword in cfg[field]:
+                    keyword, whole = parse_keyword(keyword)
+                    if not keyword:
+                        continue
+                    whole = whole or whole_words
+                    masks = entries.setdefault((keyword, whole), {"include": 0, "exclude": 0})
+                    masks[field] |= 1 << bit
+
+        for (keyword, whole), masks in entries.items():
+            self._add(keyword, (len(keyword), whole, masks["include"], masks["exclude"]))
+        self._link()
+
+    def _add(self, keyword, entry):
+        node = 0
+        for char in keyword:
+            nxt = self._goto[node].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+                self._goto[node][char] = nxt
+            node = nxt
+        self._out[node] += (entry,)
+
+    def _link(self):
+        """Compute failure links breadth-first and merge their outputs."""
+        goto, fail, out = self._goto, self._fail, self._out
+        queue = list(goto[0].values())
+        for node in queue:
+            for char, child in goto[node].items():
+                queue.append(child)
+                state = fail[node]
+                while state and char not in goto[state]:
+                    state = fail[state]
+                fail[child] = goto[state].get(char, 0)
+                out[child] += out[fail[child]]
+
+    def match(self, title):
+        """Return the bitmask of channels whose keywords accept a lowercased title."""
+        goto, fail, out = self._goto, self._fail, self._out
+        include = exclude = 0
+        node = 0
+
+        for end, char in enumerate(title):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+
+            for length, whole, include_mask, exclude_mask in out[node]:
+                if whole:
+                    start = end - length + 1
+                    if start > 0 and _is_word_char(title[start - 1]):
+                        continue
+                    if end + 1 < len(title) and _is_word_char(title[end + 1]):
+                        continue
+                include |= include_mask
+                exclude |= exclude_mask
+
+        return include & ~exclude
+
+    def mask_for(self, channel_configs):
+        """Return the bitmask covering the given channels."""
+        wanted = {id(cfg) for cfg in channel_configs}
+        mask = 0
+        for bit, cfg in enumerate(self.channels):
+            if id(cfg) in wanted:
+                mask |= 1 << bit
+        return mask
+
+    def channels_for(self, mask):
+        """Return the channel configs selected by a bitmask."""
+        selected = []
+        while mask:
+            low = mask & -mask
+            selected.append(self.channels[low.bit_length() - 1])
+            mask ^= low
+        return selected
@@ -0,0 +1,87 @@
+"""Time budgeting for runs.
+
+A Lambda invocation has a hard deadline. The planner turns the remaining
+time into a scraping cutoff and a posting cutoff, and orders queries so
+the ones that usually find jobs get the fetch slots first. It also sizes
+each query's search window to the time since its last complete run.
+"""
+import time
+
+# Seconds kept free at the end to save unsent posts and query state
+SAFETY_MARGIN = 5.0
+# Seconds of the budget held back for posting what was scraped
+POST_RESERVE = 15.0
+# Weight of the latest run in each query's moving average of jobs found
+YIELD_WEIGHT = 0.3
+
+# Search window in seconds: the gap since the last complete run plus some
+# overlap, so postings that appear while a run pages are caught next time
+WINDOW_OVERLAP = 60
+MIN_WINDOW = 120
+MAX_WINDOW = 24 * 3600
+
+
+def run_deadline(context, clock=time.monotonic):
+    """Return the monotonic time by which a run must finish, or None without a Lambda context."""
+    remaining = getattr(context, "get_remaining_time_in_millis", None)
+    if remaining is None:
+        return None
+    return clock() + remaining() / 1000 - SAFETY_MARGIN
+
+
+def scrape_deadline(deadline):
+    """Return when scraping must stop so posting keeps its reserve."""
+    if deadline is None:
+        return None
+    return deadline - POST_RESERVE
+
+
+def time_left(deadline, clock=time.monotonic):
+    """Return the seconds until deadline (never negative), or None for no deadline."""
+    if deadline is None:
+        return None
+    return max(0.0, deadline - clock())
+
+
+def order_queries(keys, states):
+    """Return query keys in the order they should be fetched.
+
+    Queries cut off by the previous run's deadline go first, then queries
+    with no history, then the rest by their average number of jobs found.
+    """
+    def priority(key):
+        state = states.get(key) or {}
+        expected = state.get("yield")
+        return (
+            not state.get("interrupted"),
+            expected is not None,
+            -(expected or 0),
+        )
+
+    return sorted(keys, key=priority)
+
+
+def record_run(state, found, finished):
+    """Return the query's state updated with one run's outcome."""
+    previous = state.get("yield")
+    if previous is None:
+        expected = found
+    elif finished:
+        expected = (1 - YIELD_WEIGHT) * previous + YIELD_WEIGHT * found
+    else:
+        # A cut-off run undercounts, so only raise the estimate
+        expected = max(previous, found)
+    return {**state, "yield": expected, "interrupted": not finished}
+
+
+def search_window(default, last_success=None, now=None):
+    """Return how many seconds back a query should look.
+
+    Without history this is the configured window (default). Otherwise it
+    covers everything since the last complete run started, so a late or
+    skipped run leaves no gap and frequent runs don't overlap much.
+    """
+    if not last_success:
+        return default
+    gap = (now or time.time()) - last_success + WINDOW_OVERLAP
+    return int(min(MAX_WINDOW, max(MIN_WINDOW, gap)))
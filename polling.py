@@ -0,0 +1,75 @@
+"""Adaptive polling intervals for daemon mode.
+
+Each query's arrival rate is learned from moving averages of new jobs
+per poll and seconds per poll, overall and per UTC hour of day. A fixed request budget is then
+split across queries to minimize the expected delay before a new posting
+is seen: with rate r_i and c_i requests per poll, polling every
+T_i = sqrt(c_i / r_i) * sum_j sqrt(c_j * r_j) / budget spends exactly the
+budget, and no other split gives a lower sum of r_i * T_i / 2. Quiet
+queries drift to the maximum interval, busy ones towards the minimum.
+"""
+import math
+import time
+
+# Weight of the newest poll in the moving averages
+RATE_WEIGHT = 0.1
+# Polls an hour-of-day bucket needs before it is trusted over the overall rate
+PROFILE_MIN_SAMPLES = 3
+# Rate floor, so a query that has never found anything is still polled
+MIN_RATE = 1e-6
+
+
+class PollScheduler:
+    """Learn each query's posting rate and share a request budget between queries.
+
+    budget is in requests per second across all queries; intervals are
+    clamped to [min_interval, max_interval] seconds. defaults maps query
+    keys to the interval to assume before anything has been observed.
+    """
+
+    def __init__(self, defaults, budget, min_interval, max_interval):
+        self.budget = budget
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        # Averages start as one job per default interval
+        self.queries = {
+            key: {
+                "overall": {"jobs": 1.0, "seconds": float(interval), "samples": 0},
+                "hours": [None] * 24,
+                "cost": 1.0,
+                "last_poll": None,
+            }
+            for key, interval in defaults.items()
+        }
+
+    def record(self, key, new_jobs, requests, now=None):
+        """Fold one poll's outcome into the query's estimates."""
+        now = now or time.time()
+        query = self.queries[key]
+        if query["last_poll"] is not None and now > query["last_poll"]:
+            seconds = now - query["last_poll"]
+            hour = time.gmtime(now).tm_hour
+            if query["hours"][hour] is None:
+                query["hours"][hour] = {"jobs": new_jobs, "seconds": seconds, "samples": 0}
+            for average in (query["overall"], query["hours"][hour]):
+                average["jobs"] += RATE_WEIGHT * (new_jobs - average["jobs"])
+                average["seconds"] += RATE_WEIGHT * (seconds - average["seconds"])
+                average["samples"] += 1
+        if requests:
+            query["cost"] += RATE_WEIGHT * (requests - query["cost"])
+        query["last_poll"] = now
+
+    def rate(self, key, now=None):
+        """Return the expected new jobs per second for a query at this hour."""
+        query = self.queries[key]
+        average = query["hours"][time.gmtime(now or time.time()).tm_hour]
+        if average is None or average["samples"] < PROFILE_MIN_SAMPLES:
+            average = query["overall"]
+        return max(MIN_RATE, average["jobs"] / average["seconds"])
+
+    def interval(self, key, now=None):
+        """Return how many seconds to wait before polling a query again."""
+        rates = {other: self.rate(other, now) for other in self.queries}
+        spread = sum(math.sqrt(self.queries[other]["cost"] * rate) for other, rate in rates.items())
+        ideal = math.sqrt(self.queries[key]["cost"] / rates[key]) * spread / self.budget
+        return min(self.max_interval, max(self.min_interval, ideal))
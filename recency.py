@@ -0,0 +1,92 @@
+"""Posting-time parsing for LinkedIn job cards.
+
+Cards carry a relative text ("2 minutes ago", "for 5 minutter siden", "il y
+a 3 heures", "vor 1 Stunde") and a <time datetime=...> attribute. LinkedIn
+usually sends only the date in the attribute. A date is enough to rule out
+old cards, and the text gives the exact age.
+"""
+import re
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+
+RECENT_WINDOW = timedelta(minutes=5)
+
+RELATIVE_PATTERN = re.compile(r"(\d+)\s*([^\W\d_]+)")
+
+# Unit words in English, Danish, French and German
+UNIT_SECONDS = {
+    **dict.fromkeys(["second", "seconds", "sec", "secs", "sekund", "sekunder", "seconde", "secondes", "sekunde", "sekunden"], 1),
+    **dict.fromkeys(["minute", "minutes", "min", "mins", "minut", "minutter", "minuten"], 60),
+    **dict.fromkeys(["hour", "hours", "hr", "hrs", "time", "timer", "heure", "heures", "h", "stunde", "stunden", "std"], 3600),
+    **dict.fromkeys(["day", "days", "dag", "dage", "jour", "jours", "tag", "tagen", "tage"], 86400),
+    **dict.fromkeys(["week", "weeks", "uge", "uger", "semaine", "semaines", "woche", "wochen"], 7 * 86400),
+    **dict.fromkeys(["month", "months", "måned", "måneder", "mois", "monat", "monaten", "monate"], 30 * 86400),
+}
+
+JUST_NOW = {"just now", "now", "lige nu", "nu", "à l'instant", "a l'instant", "gerade eben", "gerade", "jetzt"}
+
+
+def now_utc():
+    """Return the reference timestamp for a run."""
+    return datetime.now(timezone.utc)
+
+
+@lru_cache(maxsize=256)
+def parse_age(text):
+    """Return how long ago a relative posting text was, or None if unknown."""
+    if not text:
+        return None
+    text = text.strip().lower()
+    if text in JUST_NOW:
+        return timedelta(0)
+
+    match = RELATIVE_PATTERN.search(text)
+    if not match:
+        return None
+    seconds = UNIT_SECONDS.get(match.group(2).rstrip("."))
+    if seconds is None:
+        return None
+    return timedelta(seconds=int(match.group(1)) * seconds)
+
+
+@lru_cache(maxsize=256)
+def parse_datetime_attr(value):
+    """Return a datetime for full timestamps, a date for day-only values, or None."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        if len(value) <= 10:
+            return date.fromisoformat(value)
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def posted_at(text, datetime_attr=None, now=None):
+    """Return when a card was posted as an aware datetime, or None."""
+    now = now or now_utc()
+    stamp = parse_datetime_attr(datetime_attr)
+    if isinstance(stamp, datetime):
+        return stamp
+
+    age = parse_age(text)
+    if age is not None:
+        return now - age
+    if stamp is not None:
+        return datetime(stamp.year, stamp.month, stamp.day, tzinfo=timezone.utc)
+    return None
+
+
+def is_recent(text, datetime_attr=None, now=None, window=RECENT_WINDOW):
+    """Return True if a card was posted within the window before now."""
+    stamp = parse_datetime_attr(datetime_attr)
+    if isinstance(stamp, datetime):
+        return (now or now_utc()) - stamp <= window
+    # Day-only dates are in the poster's timezone, so allow a day of slack
+    if stamp is not None and stamp < ((now or now_utc()) - window - timedelta(days=1)).date():
+        return False
+
+    age = parse_age(text)
+    return age is not None and age <= window
@@ -0,0 +1,106 @@
+"""Splitting one run across parallel invocations.
+
+A shard spec selects part of the work, in one of three shapes:
+
+    {"channels": ["DISCORD_CHANNEL_ID_X", 1234]}  channels by env name or id
+    {"range": [0.0, 0.5]}                        queries whose key hashes into [lo, hi)
+    {"index": 0, "count": 4}                     every 4th query, starting at 0
+
+Channel shards fetch each query their channels need; query shards fetch
+each query in exactly one shard and route it to all of its channels.
+"""
+import hashlib
+
+# Query keys are hex digests; their first 8 digits place them in [0, 1)
+KEY_DIGITS = 8
+
+
+def key_position(key):
+    """Return where a query key falls in [0, 1)."""
+    return int(key[:KEY_DIGITS], 16) / 16 ** KEY_DIGITS
+
+
+def parse_shard(spec):
+    """Return a normalized shard dict from an event value or CLI string, or None for everything.
+
+    CLI strings are "2/8" (N-of-M), "0.25:0.5" (hash range) or a
+    comma-separated channel list. Raises ValueError on a malformed spec.
+    """
+    if not spec:
+        return None
+    if isinstance(spec, str):
+        if "/" in spec:
+            index, count = spec.split("/", 1)
+            spec = {"index": index, "count": count}
+        elif ":" in spec:
+            spec = {"range": spec.split(":", 1)}
+        else:
+            spec = {"channels": [item.strip() for item in spec.split(",") if item.strip()]}
+
+    if "channels" in spec:
+        return {"channels": [str(channel) for channel in spec["channels"]]}
+    if "range" in spec:
+        lo, hi = (float(bound) for bound in spec["range"])
+        if not 0 <= lo < hi <= 1:
+            raise ValueError(f"Shard range must satisfy 0 <= lo < hi <= 1, got {lo}, {hi}")
+        return {"range": [lo, hi]}
+    if "count" in spec:
+        index, count = int(spec.get("index", 0)), int(spec["count"])
+        if not 0 <= index < count:
+            raise ValueError(f"Shard index must be in [0, {count}), got {index}")
+        return {"index": index, "count": count}
+    raise ValueError(f"Unknown shard spec: {spec!r}")
+
+
+def shard_name(shard):
+    """Return a stable name for a shard, used for its lease."""
+    if shard is None:
+        return "all"
+    if "channels" in shard:
+        return "channels:" + ",".join(sorted(shard["channels"]))
+    if "range" in shard:
+        return "range:{}:{}".format(*shard["range"])
+    return f"{shard['index']}/{shard['count']}"
+
+
+def shard_channels(channel_configs, shard):
+    """Return the channel configs a shard posts to."""
+    if shard is None or "channels" not in shard:
+        return channel_configs
+    wanted = set(shard["channels"])
+    return [
+        cfg for cfg in channel_configs
+        if cfg["channel_env"] in wanted or str(cfg["channel_id"]) in wanted
+    ]
+
+
+def shard_plan(plan, shard):
+    """Return the part of a query plan a shard fetches."""
+    if shard is None or "channels" in shard:
+        return plan
+    if "range" in shard:
+        lo, hi = shard["range"]
+        return {key: query for key, query in plan.items() if lo <= key_position(key) < hi}
+    return {
+        key: query for key, query in plan.items()
+        if int(key[:KEY_DIGITS], 16) % shard["count"] == shard["index"]
+    }
+
+
+def shard_scope(key, query, shard):
+    """Return the name a shard keeps a query's seen ids and pagination state under.
+
+    Query shards fetch each query in one place and share its key. Channel
+    shards can fetch the same query for different channels, so each set of
+    channels keeps its own, and one shard's progress never hides a job from
+    another's channels.
+    """
+    if shard is None or "channels" not in shard:
+        return key
+    channel_ids = ",".join(sorted(str(cfg["channel_id"]) for cfg in query["channels"]))
+    return f"{key}:{hashlib.sha1(channel_ids.encode('utf-8')).hexdigest()[:8]}"
+
+
+def shard_events(count):
+    """Return one lambda_handler event per N-of-M shard."""
+    return [{"shard": {"index": index, "count": count}} for index in range(count)]
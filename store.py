@@ -0,0 +1,306 @@
+"""Local state that survives between runs."""
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import tempfile
+import time
+
+DEFAULT_DB_PATH = os.getenv(
+    "STATE_DB_PATH", os.path.join(tempfile.gettempdir(), "jobs-on-discord.sqlite3")
+)
+
+# Seen jobs are forgotten after a week
+SEEN_TTL = 7 * 24 * 3600
+# Posts a run could not send are retried for a day, then dropped
+PENDING_TTL = 24 * 3600
+# Seconds a run waits for another run's write to finish
+LOCK_TIMEOUT = 30
+BLOOM_MIN_CAPACITY = 10_000
+BLOOM_ERROR_RATE = 0.01
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings."""
+
+    def __init__(self, capacity, error_rate=BLOOM_ERROR_RATE):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class SeenStore:
+    """SQLite-backed set of LinkedIn job ids with a Bloom filter in front.
+
+    A Bloom miss answers "not seen" without touching the database; only
+    possible hits are confirmed with a primary-key lookup. The filter's bits
+    are stored next to the ids, so opening the store reads one row instead
+    of hashing the whole history; it is rebuilt from the ids only the first
+    time and when it fills up.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH, ttl=SEEN_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.conn = sqlite3.connect(path, timeout=LOCK_TIMEOUT)
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS seen_jobs (job_id TEXT PRIMARY KEY, seen_at REAL NOT NULL)"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS seen_jobs_seen_at ON seen_jobs (seen_at)")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS seen_bloom (id INTEGER PRIMARY KEY CHECK (id = 1), "
+                "capacity INTEGER NOT NULL, count INTEGER NOT NULL, bits BLOB NOT NULL)"
+            )
+        self.evict()
+        self.bloom = self._stored_bloom()
+        if self.bloom is None:
+            with self.conn:
+                self.conn.execute("BEGIN IMMEDIATE")
+                self.bloom = self._stored_bloom() or self._rebuild_bloom()
+
+    def _stored_bloom(self):
+        row = self.conn.execute("SELECT capacity, count, bits FROM seen_bloom WHERE id = 1").fetchone()
+        if row is None:
+            return None
+        capacity, count, bits = row
+        bloom = BloomFilter(capacity)
+        if len(bits) != len(bloom.bits):
+            return None
+        bloom.bits = bytearray(bits)
+        bloom.count = count
+        return bloom
+
+    def _rebuild_bloom(self, min_capacity=BLOOM_MIN_CAPACITY):
+        """Hash every stored id into a fresh filter with room to grow, and store it."""
+        (count,) = self.conn.execute("SELECT COUNT(*) FROM seen_jobs").fetchone()
+        bloom = BloomFilter(max(min_capacity, count * 2))
+        for (job_id,) in self.conn.execute("SELECT job_id FROM seen_jobs"):
+            bloom.add(job_id)
+        self._save_bloom(bloom)
+        return bloom
+
+    def _save_bloom(self, bloom):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO seen_bloom (id, capacity, count, bits) VALUES (1, ?, ?, ?)",
+            (bloom.capacity, bloom.count, bytes(bloom.bits)),
+        )
+
+    def evict(self, now=None):
+        """Drop ids older than the TTL.
+
+        Their bits stay set until the filter is next rebuilt, which only
+        costs a primary-key lookup that finds nothing.
+        """
+        cutoff = (now or time.time()) - self.ttl
+        with self.conn:
+            self.conn.execute("DELETE FROM seen_jobs WHERE seen_at < ?", (cutoff,))
+
+    def __contains__(self, job_id):
+        if not job_id or job_id not in self.bloom:
+            return False
+        row = self.conn.execute(
+            "SELECT 1 FROM seen_jobs WHERE job_id = ? AND seen_at >= ?",
+            (job_id, time.time() - self.ttl),
+        ).fetchone()
+        return row is not None
+
+    def add_many(self, job_ids, now=None):
+        """Record job ids as seen."""
+        now = now or time.time()
+        job_ids = [job_id for job_id in job_ids if job_id]
+        if not job_ids:
+            return
+        with self.conn:
+            # Lock first: the stored filter may hold ids other runs added since it was loaded
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO seen_jobs (job_id, seen_at) VALUES (?, ?)",
+                [(job_id, now) for job_id in job_ids],
+            )
+            bloom = self._stored_bloom()
+            if bloom is None or bloom.count + len(job_ids) > bloom.capacity:
+                bloom = self._rebuild_bloom()
+            else:
+                for job_id in job_ids:
+                    bloom.add(job_id)
+                self._save_bloom(bloom)
+        self.bloom = bloom
+
+    def scoped(self, scope):
+        """Return a view of this store whose ids are kept apart under scope."""
+        return ScopedSeen(self, scope)
+
+    def close(self):
+        self.conn.close()
+
+
+class ScopedSeen:
+    """One scope's job ids inside a SeenStore, such as a single query's.
+
+    Overlapping queries surface the same posting; keeping each query's ids
+    apart lets every one of them hand it on to its own channels.
+    """
+
+    def __init__(self, store, scope):
+        self.store = store
+        self.scope = scope
+
+    def __contains__(self, job_id):
+        return bool(job_id) and f"{self.scope}:{job_id}" in self.store
+
+    def add_many(self, job_ids, now=None):
+        self.store.add_many((f"{self.scope}:{job_id}" for job_id in job_ids if job_id), now)
+
+
+class StateStore:
+    """Run-to-run bookkeeping kept next to the seen jobs.
+
+    query_state holds a small JSON object per query key (yield history and
+    the like); pending_posts holds jobs routed to a channel that a run ran
+    out of time to post, so the next run sends them first. leases and
+    post_claims coordinate runs sharing the file: a lease gives one run a
+    named piece of work for a while, and a claim lets exactly one run post
+    a job to a channel.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH, pending_ttl=PENDING_TTL, claim_ttl=SEEN_TTL):
+        self.path = path
+        self.pending_ttl = pending_ttl
+        self.claim_ttl = claim_ttl
+        # When each taken post was first queued, so putting it back keeps its age
+        self._taken = {}
+        self.conn = sqlite3.connect(path, timeout=LOCK_TIMEOUT)
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS query_state "
+                "(query_key TEXT PRIMARY KEY, state TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS pending_posts (channel_id INTEGER NOT NULL, job_id TEXT NOT NULL, "
+                "job TEXT NOT NULL, queued_at REAL NOT NULL, PRIMARY KEY (channel_id, job_id))"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS leases "
+                "(name TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS post_claims (channel_id INTEGER NOT NULL, job_id TEXT NOT NULL, "
+                "claimed_at REAL NOT NULL, PRIMARY KEY (channel_id, job_id))"
+            )
+            self.conn.execute(
+                "DELETE FROM pending_posts WHERE queued_at < ?", (time.time() - self.pending_ttl,)
+            )
+            self.conn.execute(
+                "DELETE FROM post_claims WHERE claimed_at < ?", (time.time() - self.claim_ttl,)
+            )
+
+    def query_states(self, keys):
+        """Return {query_key: state} for the given keys, {} for unknown ones."""
+        states = {key: {} for key in keys}
+        for key, state in self.conn.execute("SELECT query_key, state FROM query_state"):
+            if key in states:
+                states[key] = json.loads(state)
+        return states
+
+    def put_query_states(self, states, now=None):
+        now = now or time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO query_state (query_key, state, updated_at) VALUES (?, ?, ?)",
+                [(key, json.dumps(state), now) for key, state in states.items()],
+            )
+
+    def take_pending(self, channel_ids):
+        """Remove and return {channel_id: [job dicts]} queued for the given channels.
+
+        Taking is atomic, so concurrent runs never both get the same post; a
+        run that cannot send them puts them back with add_pending.
+        """
+        channel_ids = set(channel_ids)
+        pending = {}
+        with self.conn:
+            # Lock before reading so no other run can take the same rows
+            self.conn.execute("BEGIN IMMEDIATE")
+            rows = self.conn.execute(
+                "SELECT channel_id, job_id, job, queued_at FROM pending_posts ORDER BY queued_at, rowid"
+            ).fetchall()
+            rows = [row for row in rows if row[0] in channel_ids]
+            self.conn.executemany(
+                "DELETE FROM pending_posts WHERE channel_id = ? AND job_id = ?",
+                [(channel_id, job_id) for channel_id, job_id, _, _ in rows],
+            )
+        for channel_id, job_id, job, queued_at in rows:
+            pending.setdefault(channel_id, []).append(json.loads(job))
+            self._taken[(channel_id, job_id)] = queued_at
+        return pending
+
+    def add_pending(self, channel_id, jobs, now=None):
+        """Queue job dicts (each with an "id") for a channel.
+
+        A post this store took earlier keeps its first queued_at, so the
+        pending TTL still drops posts that keep failing.
+        """
+        now = now or time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO pending_posts (channel_id, job_id, job, queued_at) VALUES (?, ?, ?, ?)",
+                [
+                    (channel_id, job["id"], json.dumps(job), self._taken.get((channel_id, job["id"]), now))
+                    for job in jobs if job.get("id")
+                ],
+            )
+
+    def acquire_lease(self, name, owner, ttl, now=None):
+        """Return True if owner now holds the named lease for ttl seconds.
+
+        A lease is granted when it is free, expired or already owner's.
+        """
+        now = now or time.time()
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO leases (name, owner, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+                "WHERE leases.owner = excluded.owner OR leases.expires_at < ?",
+                (name, owner, now + ttl, now),
+            )
+            (holder,) = self.conn.execute("SELECT owner FROM leases WHERE name = ?", (name,)).fetchone()
+        return holder == owner
+
+    def release_lease(self, name, owner):
+        with self.conn:
+            self.conn.execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner))
+
+    def claim_posts(self, pairs, now=None):
+        """Claim (channel_id, job_id) pairs; return the set this call won."""
+        now = now or time.time()
+        granted = set()
+        with self.conn:
+            for channel_id, job_id in pairs:
+                cursor = self.conn.execute(
+                    "INSERT OR IGNORE INTO post_claims (channel_id, job_id, claimed_at) VALUES (?, ?, ?)",
+                    (channel_id, job_id, now),
+                )
+                if cursor.rowcount == 1:
+                    granted.add((channel_id, job_id))
+        return granted
+
+    def close(self):
+        self.conn.close()